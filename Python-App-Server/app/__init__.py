@@ -22,6 +22,14 @@ def create_app():
     # Init DB
     db.init_app(app)
 
+    # Rate limiting and load shedding
+    from app.limits import init_limits
+    init_limits(app)
+
+    # Catalog snapshot CLI
+    from app.snapshots import init_snapshots
+    init_snapshots(app)
+
     # Register Blueprints
     from app.routes.user_routes import user_bp
     from app.routes.product_routes import product_bp
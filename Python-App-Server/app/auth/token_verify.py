@@ -1,6 +1,6 @@
 from jose import jwt
 import requests
-from flask import current_app
+from flask import current_app, g
 
 _JWKS = None
 
@@ -34,3 +34,13 @@ def verify_token(token):
         issuer=f"https://cognito-idp.{current_app.config['COGNITO_REGION']}.amazonaws.com/{current_app.config['USERPOOL_ID']}",
         options={"verify_at_hash": False}
     )
+
+
+def get_token_claims(token):
+    """verify_token, but reuses claims already verified for this token during the request"""
+    cached = g.get('token_claims')
+    if cached is not None and cached[0] == token:
+        return cached[1]
+    claims = verify_token(token)
+    g.token_claims = (token, claims)
+    return claims
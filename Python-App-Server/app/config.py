@@ -55,3 +55,15 @@ class Config:
     USERPOOL_ID = cognito_config['user_pool_id']
     CLIENT_ID = cognito_config['client_id']
     JWKS_URL = f"https://cognito-idp.{COGNITO_REGION}.amazonaws.com/{USERPOOL_ID}/.well-known/jwks.json"
+
+    # Rate limiting and load shedding (see app/limits.py)
+    RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL")  # Shared buckets across tasks, in-memory if unset
+    SHED_MAX_INFLIGHT = int(os.getenv("SHED_MAX_INFLIGHT", "64"))  # Reads are shed past this many requests in flight
+    SHED_MAX_WRITE_INFLIGHT = int(os.getenv("SHED_MAX_WRITE_INFLIGHT", "32"))  # Writes are shed past this many writes in flight
+    SHED_POOL_UTILIZATION = float(os.getenv("SHED_POOL_UTILIZATION", "0.8"))
+
+    # Static catalog snapshots for CloudFront (see app/snapshots.py), disabled if no bucket is set
+    CATALOG_SNAPSHOT_BUCKET = os.getenv("CATALOG_SNAPSHOT_BUCKET")
+    CATALOG_SNAPSHOT_PREFIX = os.getenv("CATALOG_SNAPSHOT_PREFIX", "catalog")
+    CATALOG_SNAPSHOT_PAGE_SIZE = int(os.getenv("CATALOG_SNAPSHOT_PAGE_SIZE", "500"))
+    CATALOG_SNAPSHOT_DEBOUNCE = float(os.getenv("CATALOG_SNAPSHOT_DEBOUNCE", "30"))  # Seconds without changes before publishing
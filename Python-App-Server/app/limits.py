@@ -0,0 +1,207 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+import redis
+from flask import g, jsonify, request
+from sqlalchemy.pool import QueuePool
+from app import db
+from app.auth.token_verify import get_token_claims
+
+# Token buckets per endpoint: (tokens refilled per second, burst size).
+# Each caller (Cognito sub, or client IP when there is no valid token) gets its own bucket.
+DEFAULT_RATE_LIMITS = {
+    'order_bp.place_order': (0.5, 5),
+    'product_bp.add_product': (0.2, 3),
+    'user_bp.track_user': (1, 10),
+}
+
+# Never limited or shed, the ALB needs to reach the health check under load
+EXEMPT_ENDPOINTS = {'user_bp.health_check', 'static'}
+READ_METHODS = {'GET', 'HEAD'}
+
+
+class MemoryBucketStore:
+    """Token buckets kept in process memory (per ECS task / worker)"""
+
+    # Least recently seen callers are evicted past this many buckets; an
+    # evicted caller just starts again from a full bucket
+    MAX_BUCKETS = 100000
+
+    def __init__(self):
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, rate, burst):
+        """Take one token, returning 0 if allowed or the seconds to wait before retrying"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - last) * rate)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                retry_after = 0
+            else:
+                self._buckets[key] = (tokens, now)
+                retry_after = (1 - tokens) / rate
+            self._buckets.move_to_end(key)
+            if len(self._buckets) > self.MAX_BUCKETS:
+                self._buckets.popitem(last=False)
+        return retry_after
+
+
+class RedisBucketStore:
+    """Token buckets shared by every task through a Redis-compatible server"""
+
+    # Refill and take atomically on the server, using the server clock
+    TAKE_SCRIPT = """
+    local rate = tonumber(ARGV[1])
+    local burst = tonumber(ARGV[2])
+    local time = redis.call('TIME')
+    local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+    local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+    local tokens = tonumber(bucket[1]) or burst
+    local last = tonumber(bucket[2]) or now
+    tokens = math.min(burst, tokens + math.max(0, now - last) * rate)
+    local allowed = 0
+    if tokens >= 1 then
+        tokens = tokens - 1
+        allowed = 1
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+    redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+    return {allowed, tostring(tokens)}
+    """
+
+    def __init__(self, url):
+        self._client = redis.Redis.from_url(url)
+        # from_url does not connect, fail at startup rather than failing open on every request
+        self._client.ping()
+        self._take = self._client.register_script(self.TAKE_SCRIPT)
+
+    def take(self, key, rate, burst):
+        allowed, tokens = self._take(keys=[f"ratelimit:{key}"], args=[rate, burst])
+        if allowed:
+            return 0
+        return (1 - float(tokens)) / rate
+
+
+class LoadShedder:
+    """Counts in-flight requests and rejects new ones once the task is saturated.
+
+    Reads are capped on all in-flight requests, writes on in-flight writes
+    only, so a burst of catalog reads cannot lock out checkout. Writes back
+    off earlier on DB pool pressure so browsing keeps working while order
+    placement is slowed down.
+    """
+
+    def __init__(self, max_inflight, max_write_inflight, pool_utilization):
+        self.max_inflight = max_inflight
+        self.max_write_inflight = max_write_inflight
+        self.pool_utilization = pool_utilization
+        self.inflight = 0
+        self.write_inflight = 0
+        self._lock = threading.Lock()
+
+    def _pool_saturated(self, threshold):
+        pool = db.engine.pool
+        # Only QueuePool has a fixed capacity; other pools are never considered saturated
+        if not isinstance(pool, QueuePool):
+            return False
+        capacity = pool.size() + max(pool._max_overflow, 0)
+        return capacity > 0 and pool.checkedout() >= capacity * threshold
+
+    def acquire(self, is_read):
+        """Reserve an in-flight slot, returning False if the request should be shed"""
+        # Reads only back off once the pool is completely used up
+        pool_threshold = 1 if is_read else self.pool_utilization
+        with self._lock:
+            if is_read and self.inflight >= self.max_inflight:
+                return False
+            if not is_read and self.write_inflight >= self.max_write_inflight:
+                return False
+            if self._pool_saturated(pool_threshold):
+                return False
+            self.inflight += 1
+            if not is_read:
+                self.write_inflight += 1
+        return True
+
+    def release(self, is_read):
+        with self._lock:
+            self.inflight -= 1
+            if not is_read:
+                self.write_inflight -= 1
+
+
+def _client_key():
+    """Verified Cognito sub when a valid token is sent, otherwise the client IP"""
+    token = request.headers.get("Authorization", "").replace("Bearer ", "")
+    if token:
+        try:
+            return f"sub:{get_token_claims(token)['sub']}"
+        except Exception:
+            pass  # Invalid tokens are limited by IP like anonymous callers
+    # The ALB appends the address it saw to X-Forwarded-For, earlier entries are client supplied
+    forwarded = request.headers.get("X-Forwarded-For")
+    if forwarded:
+        return f"ip:{forwarded.split(',')[-1].strip()}"
+    return f"ip:{request.remote_addr}"
+
+
+def _too_many(message, retry_after, status):
+    response = jsonify({"error": message})
+    response.status_code = status
+    response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+def init_limits(app):
+    """Register rate limiting and load shedding on the app"""
+    rate_limits = app.config.get('RATE_LIMITS', DEFAULT_RATE_LIMITS)
+    shed_retry_after = app.config.get('SHED_RETRY_AFTER', 1)
+
+    # No fallback when a shared store is configured: per-task buckets would
+    # silently multiply every limit by the number of tasks
+    redis_url = app.config.get('RATE_LIMIT_REDIS_URL')
+    store = RedisBucketStore(redis_url) if redis_url else MemoryBucketStore()
+
+    shedder = LoadShedder(
+        max_inflight=app.config.get('SHED_MAX_INFLIGHT', 64),
+        max_write_inflight=app.config.get('SHED_MAX_WRITE_INFLIGHT', 32),
+        pool_utilization=app.config.get('SHED_POOL_UTILIZATION', 0.8),
+    )
+    app.extensions['limits'] = {'store': store, 'shedder': shedder}
+
+    @app.before_request
+    def admit_request():
+        if request.method == 'OPTIONS' or request.endpoint in EXEMPT_ENDPOINTS:
+            return None
+
+        # Shed before taking a rate limit token, so a shed request does not
+        # cost the caller a token it never got service for
+        is_read = request.method in READ_METHODS
+        if not shedder.acquire(is_read):
+            return _too_many("Server is busy, please retry shortly", shed_retry_after, 503)
+
+        limit = rate_limits.get(request.endpoint)
+        if limit:
+            rate, burst = limit
+            try:
+                retry_after = store.take(f"{request.endpoint}:{_client_key()}", rate, burst)
+            except Exception as e:
+                # Fail open, a broken limiter store must not take the API down
+                print(f"Error checking rate limit: {e}")
+                retry_after = 0
+            if retry_after:
+                shedder.release(is_read)
+                return _too_many("Too many requests", retry_after, 429)
+
+        g.limits_slot = 'read' if is_read else 'write'
+        return None
+
+    @app.teardown_request
+    def release_slot(exc):
+        slot = g.pop('limits_slot', None)
+        if slot:
+            shedder.release(slot == 'read')
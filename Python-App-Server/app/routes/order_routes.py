@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 from app.models import User, Product, Order, OrderProduct
 from app import db
+from app import serializers
 from app.auth.token_verify import verify_token # Assuming this is for user authentication/authorization
 import traceback
 import boto3 # Import boto3 for AWS SDK
@@ -51,31 +52,10 @@ SQS_QUEUE_URL = get_sqs_queue_url(SQS_QUEUE_NAME)
 # You might want to add @verify_token here if this is a protected route
 def get_user_orders(user_sub):
     try:
-        user = User.query.filter_by(sub=user_sub).first()
+        user = db.session.query(User.uid).filter_by(sub=user_sub).first()
         if not user:
             return jsonify({"error": "User not found"}), 404
-        orders_list = []
-        for order in user.orders:
-            order_dict = {
-                'order_id': order.oid,
-                'products': []
-            }
-            order_products = OrderProduct.query.filter_by(oid=order.oid).all()
-            for op in order_products:
-                product = Product.query.filter_by(pid=op.pid).first()
-                if product:
-                    order_dict['products'].append({
-                        'pid': product.pid,
-                        'category': product.category,
-                        'gender': product.gender,
-                        'productName': product.productName,
-                        'size': product.size,
-                        'price': str(product.price),
-                        'thumbLink': product.thumbLink,
-                        'quantity': op.count  # <-- Add quantity here
-                    })
-            orders_list.append(order_dict)
-        return jsonify(orders_list)
+        return serializers.json_response(serializers.user_orders(user.uid))
     except Exception as e:
         traceback.print_exc()
         return jsonify({"error": str(e)}), 500
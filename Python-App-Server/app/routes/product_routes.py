@@ -5,6 +5,8 @@ import os
 import time
 from app.models import Product
 from app import db
+from app import serializers
+from app import snapshots
 
 product_bp = Blueprint('product_bp', __name__)
 
@@ -95,6 +97,7 @@ def add_product():
         # Save to database
         db.session.add(product)
         db.session.commit()
+        snapshots.schedule_publish()
 
         return jsonify({
             'message': 'Product added successfully',
@@ -116,35 +119,24 @@ def add_product():
 @product_bp.route('/products', methods=['GET'])
 def get_all_products():
     try:
-        productList = Product.query.all()
-        return jsonify([{
-            'pid': product.pid,
-            'category': product.category,
-            'gender': product.gender,
-            'productName': product.productName,
-            'size': product.size,
-            'price': str(product.price),
-            'inventory': product.inventory,
-            'thumbLink': product.thumbLink,
-            'description': product.description
-        } for product in productList]), 200
+        # ?stream=1 sends the catalog as a chunked JSON array for large lists
+        if request.args.get('stream', type=int):
+            return serializers.stream_products()
+        return serializers.json_response(serializers.product_list(), 200)
     except Exception as e:
         return jsonify({"error": "Failed to retrieve products", "message": str(e)}), 500
 
+# Live stock counts to apply on top of a CDN catalog snapshot
+@product_bp.route('/inventory', methods=['GET'])
+def get_inventory():
+    try:
+        return serializers.json_response(serializers.inventory_map(), 200)
+    except Exception as e:
+        return jsonify({"error": "Failed to retrieve inventory", "message": str(e)}), 500
+
 @product_bp.route('/products/<int:pid>', methods=['GET'])
 def get_product(pid):
     try:
-        product = Product.query.get_or_404(pid)
-        return jsonify({
-            'pid': product.pid,
-            'category': product.category,
-            'gender': product.gender,
-            'productName': product.productName,
-            'size': product.size,
-            'price': str(product.price),
-            'inventory': product.inventory,
-            'thumbLink': product.thumbLink,
-            'description': product.description
-        }), 200
+        return serializers.json_response(serializers.product_detail(pid), 200)
     except Exception as e:
         return jsonify({"error": "Failed to retrieve product", "message": str(e)}), 500
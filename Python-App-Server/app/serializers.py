@@ -0,0 +1,105 @@
+import traceback
+from decimal import Decimal
+import orjson
+from flask import Response, stream_with_context
+from app import db
+from app.models import Order, OrderProduct, Product
+
+# Rows are read as plain column tuples (no ORM objects / identity map) and
+# zipped against these field names to build the response payloads.
+PRODUCT_FIELDS = ('pid', 'category', 'gender', 'productName', 'size', 'price', 'inventory', 'thumbLink', 'description')
+ORDER_PRODUCT_FIELDS = ('pid', 'category', 'gender', 'productName', 'size', 'price', 'thumbLink')
+
+# Number of rows fetched from the DB cursor and encoded per streamed chunk
+STREAM_CHUNK_SIZE = 1000
+
+
+def _default(obj):
+    # Prices have always been sent as strings, keep that for any Decimal
+    if isinstance(obj, Decimal):
+        return str(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(payload):
+    return orjson.dumps(payload, default=_default)
+
+
+def json_response(payload, status=200):
+    return Response(dumps(payload), status=status, mimetype='application/json')
+
+
+def _product_columns(fields):
+    # Let the DB render numeric(10,2) as text so no Decimal is built per row.
+    # A NULL price has always been sent as str(None), keep that.
+    price = db.func.coalesce(db.cast(Product.price, db.String), 'None').label('price')
+    return [price if field == 'price' else getattr(Product, field) for field in fields]
+
+
+def product_query():
+    return db.session.query(*_product_columns(PRODUCT_FIELDS))
+
+
+def product_list():
+    return [dict(zip(PRODUCT_FIELDS, row)) for row in product_query().order_by(Product.pid)]
+
+
+def product_detail(pid):
+    row = product_query().filter(Product.pid == pid).first_or_404()
+    return dict(zip(PRODUCT_FIELDS, row))
+
+
+def inventory_map():
+    # orjson only takes str keys for objects
+    return {str(pid): inventory for pid, inventory in db.session.query(Product.pid, Product.inventory)}
+
+
+def stream_json_array(rows, fields, chunk_size=STREAM_CHUNK_SIZE):
+    """Yield a JSON array of objects built from row tuples, one chunk of rows at a time"""
+    yield b'['
+    first = True
+    batch = []
+    try:
+        for row in rows:
+            batch.append(dict(zip(fields, row)))
+            if len(batch) >= chunk_size:
+                yield (b'' if first else b',') + dumps(batch)[1:-1]
+                first = False
+                batch = []
+        if batch:
+            yield (b'' if first else b',') + dumps(batch)[1:-1]
+    except Exception as e:
+        # The 200 status is already sent, so the client only sees truncated JSON; log it here
+        print(f"Error while streaming JSON array: {e}")
+        traceback.print_exc()
+        raise
+    yield b']'
+
+
+def stream_products(chunk_size=STREAM_CHUNK_SIZE):
+    rows = product_query().order_by(Product.pid).yield_per(chunk_size)
+    return Response(
+        stream_with_context(stream_json_array(rows, PRODUCT_FIELDS, chunk_size)),
+        mimetype='application/json'
+    )
+
+
+def user_orders(uid):
+    """Build the order history for a user with one query for orders and one for their products"""
+    orders = {}
+    for (oid,) in db.session.query(Order.oid).filter(Order.Useruid == uid).order_by(Order.oid):
+        orders[oid] = {'order_id': oid, 'products': []}
+
+    if orders:
+        rows = (
+            db.session.query(OrderProduct.oid, OrderProduct.count, *_product_columns(ORDER_PRODUCT_FIELDS))
+            .join(Product, Product.pid == OrderProduct.pid)
+            .filter(OrderProduct.oid.in_(orders.keys()))
+            .order_by(OrderProduct.oid, OrderProduct.id)
+        )
+        for oid, count, *product in rows:
+            item = dict(zip(ORDER_PRODUCT_FIELDS, product))
+            item['quantity'] = count
+            orders[oid]['products'].append(item)
+
+    return list(orders.values())
@@ -0,0 +1,364 @@
+import gzip
+import hashlib
+import io
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+import boto3
+import brotli
+import click
+import orjson
+from flask import current_app
+from werkzeug.utils import secure_filename
+from app import serializers
+
+# Static catalog snapshots for CloudFront.
+#
+# The catalog is split into shards ("all" plus one per category), each paged
+# into JSON arrays of PAGE_SIZE products. Every page is written three times
+# (identity, gzip, brotli) under a content-hashed key so it can be cached
+# forever. manifest.json points at the current pages (keys relative to the
+# prefix) and is the only object with a short cache lifetime. Each category
+# shard records its category name; shard keys are a readable slug plus a hash
+# of the name so different names never share a shard. The /products
+# API stays as the fallback and /inventory serves live stock counts on top of
+# a snapshot, so orders do not trigger a publish.
+#
+# Every publish also writes manifests/<version>.json. prune_snapshots keeps
+# the newest KEEP_MANIFESTS of those and deletes pages no kept manifest uses,
+# once they are older than PRUNE_GRACE (clients may still hold an older
+# manifest.json for its max-age). Page keys are content-hashed and pages are
+# not rewritten while the catalog is unchanged, so an S3 lifecycle rule based
+# on object age must not be used for them.
+#
+# Pages whose content is already in the stored manifest are reused rather than
+# compressed and uploaded again, so adding a product only touches the pages it
+# lands on. Publishes triggered by requests run in the API process and use a
+# cheaper brotli level; `flask rebuild-snapshots` re-renders everything at the
+# highest level.
+
+ALL_SHARD = 'all'
+PAGE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+MANIFEST_CACHE_CONTROL = 'public, max-age=60'
+ENCODINGS = {
+    'identity': ('.json', None),
+    'gzip': ('.json.gz', 'gzip'),
+    'br': ('.json.br', 'br'),
+}
+KEEP_MANIFESTS = 10
+# Brotli level for publishes triggered by requests and for full CLI rebuilds
+BROTLI_QUALITY = 5
+REBUILD_BROTLI_QUALITY = 11
+PRUNE_GRACE = timedelta(hours=1)
+
+# A steady stream of changes would keep pushing the debounce back, so publish
+# anyway once changes have been pending this many debounce periods
+MAX_DEBOUNCE_PERIODS = 10
+
+_s3 = None
+_timer = None
+_pending_since = None
+_publishing = False
+_dirty = False
+_timer_lock = threading.Lock()
+
+
+def get_s3_client():
+    global _s3
+    if _s3 is None:
+        s3_kwargs = {
+            'service_name': 's3',
+            'region_name': os.environ.get('AWS_REGION')
+        }
+        # Only add credentials if we're not running in AWS environment (local development)
+        if not os.environ.get('AWS_EXECUTION_ENV'):
+            if os.environ.get('AWS_ACCESS_KEY_ID') and os.environ.get('AWS_SECRET_ACCESS_KEY'):
+                s3_kwargs.update({
+                    'aws_access_key_id': os.environ.get('AWS_ACCESS_KEY_ID'),
+                    'aws_secret_access_key': os.environ.get('AWS_SECRET_ACCESS_KEY')
+                })
+        _s3 = boto3.client(**s3_kwargs)
+    return _s3
+
+
+class DirectoryBucket:
+    """Local stand-in for the S3 client, writes objects to a directory.
+
+    Each object is stored at <root>/<bucket>/<key> with its headers kept in
+    self.objects so callers can check what would have been sent to S3.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.objects = {}
+
+    def put_object(self, Bucket, Key, Body, **headers):
+        path = os.path.join(self.root, Bucket, Key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(Body)
+        self.objects[(Bucket, Key)] = headers
+
+    def get_object(self, Bucket, Key):
+        with open(os.path.join(self.root, Bucket, Key), 'rb') as f:
+            return {'Body': io.BytesIO(f.read()), **self.objects.get((Bucket, Key), {})}
+
+    def list_objects_v2(self, Bucket, Prefix, **kwargs):
+        contents = []
+        base = os.path.join(self.root, Bucket)
+        for dirpath, _, filenames in os.walk(base):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                key = os.path.relpath(path, base).replace(os.sep, '/')
+                if key.startswith(Prefix):
+                    modified = datetime.fromtimestamp(os.path.getmtime(path), timezone.utc)
+                    contents.append({'Key': key, 'LastModified': modified})
+        return {'Contents': sorted(contents, key=lambda o: o['Key']), 'IsTruncated': False}
+
+    def delete_objects(self, Bucket, Delete):
+        for obj in Delete['Objects']:
+            os.remove(os.path.join(self.root, Bucket, obj['Key']))
+            self.objects.pop((Bucket, obj['Key']), None)
+
+
+def _shard_name(category):
+    if category is None:
+        return 'category/uncategorized'
+    # The slug alone is not unique ("Tops/Tees" and "Tops Tees", non-ASCII names), the hash is
+    slug = secure_filename(category) or 'category'
+    return f"category/{slug}-{hashlib.sha256(category.encode()).hexdigest()[:8]}"
+
+
+def render_shards(products, page_size):
+    """Group products into shards and encode each page.
+
+    Returns {shard: (category, [page bytes])}, category is None for the "all" shard.
+    """
+    grouped = {ALL_SHARD: (None, products)}
+    for product in products:
+        grouped.setdefault(_shard_name(product['category']), (product['category'], []))[1].append(product)
+
+    return {
+        shard: (category, [serializers.dumps(items[i:i + page_size])
+                           for i in range(0, len(items), page_size)] or [b'[]'])
+        for shard, (category, items) in grouped.items()
+    }
+
+
+def _read_manifest(s3, bucket, key):
+    """The stored manifest, or None if there is none yet"""
+    try:
+        return orjson.loads(s3.get_object(Bucket=bucket, Key=key)['Body'].read())
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        if getattr(e, 'response', {}).get('Error', {}).get('Code') in ('NoSuchKey', '404'):
+            return None
+        raise
+
+
+def publish_catalog(s3, bucket, prefix='catalog', page_size=500, force=False, brotli_quality=BROTLI_QUALITY):
+    """Render the catalog and upload its pages and manifest, returning the published manifest.
+
+    Nothing is written if the stored manifest already has the same content, or
+    if it was generated from a newer read of the catalog (another task or a
+    slower publish got there first); the stored manifest is returned then.
+    Pages already in the stored manifest are reused unless `force` is set.
+    """
+    # Taken before reading so a publish that read older data never replaces a newer one
+    generated_at = round(time.time(), 3)
+    products = serializers.product_list()
+    shards = render_shards(products, page_size)
+    digests = {shard: [hashlib.sha256(body).hexdigest() for body in pages] for shard, (_, pages) in shards.items()}
+
+    # The version only depends on content, so tasks publishing the same catalog agree on it
+    version = hashlib.sha256(serializers.dumps(dict(sorted(digests.items())))).hexdigest()[:16]
+
+    manifest_key = f"{prefix}/manifest.json"
+    stored = _read_manifest(s3, bucket, manifest_key)
+    if stored and not force and (stored['version'] == version or stored['generated_at'] > generated_at):
+        return stored
+
+    # Uploaded pages by content hash; prune_snapshots keeps everything the stored manifest uses
+    existing = {}
+    if stored and not force:
+        for stored_shard in stored['shards'].values():
+            for entry in stored_shard['pages']:
+                existing[entry['sha256']] = entry['keys']
+
+    manifest_shards = {}
+    for shard, (category, pages) in shards.items():
+        entries = []
+        for number, (body, digest) in enumerate(zip(pages, digests[shard]), start=1):
+            if digest in existing:
+                entries.append({'page': number, 'sha256': digest, 'bytes': len(body), 'keys': existing[digest]})
+                continue
+            # mtime=0 keeps gzip output identical for identical content
+            bodies = {
+                'identity': body,
+                'gzip': gzip.compress(body, compresslevel=9, mtime=0),
+                'br': brotli.compress(body, quality=brotli_quality),
+            }
+            keys = {}
+            for encoding, (suffix, content_encoding) in ENCODINGS.items():
+                key = f"{shard}/page-{number}.{digest[:16]}{suffix}"
+                put_kwargs = {
+                    'Bucket': bucket,
+                    'Key': f"{prefix}/{key}",
+                    'Body': bodies[encoding],
+                    'ContentType': 'application/json',
+                    'CacheControl': PAGE_CACHE_CONTROL,
+                }
+                if content_encoding:
+                    put_kwargs['ContentEncoding'] = content_encoding
+                s3.put_object(**put_kwargs)
+                keys[encoding] = key
+            entries.append({'page': number, 'sha256': digest, 'bytes': len(body), 'keys': keys})
+        manifest_shards[shard] = {'pages': entries}
+        if shard != ALL_SHARD:
+            manifest_shards[shard]['category'] = category
+
+    manifest = {
+        'version': version,
+        'generated_at': generated_at,
+        'product_count': len(products),
+        'page_size': page_size,
+        'shards': manifest_shards,
+    }
+    body = serializers.dumps(manifest)
+    # Keep recent manifest versions around so a bad publish can be rolled back by copying one
+    s3.put_object(Bucket=bucket, Key=f"{prefix}/manifests/{version}.json", Body=body,
+                  ContentType='application/json', CacheControl=PAGE_CACHE_CONTROL)
+
+    # Check again right before replacing it, the uploads above can take a while
+    stored = _read_manifest(s3, bucket, manifest_key)
+    if stored and not force and stored['generated_at'] > generated_at:
+        return stored
+    s3.put_object(Bucket=bucket, Key=manifest_key, Body=body,
+                  ContentType='application/json', CacheControl=MANIFEST_CACHE_CONTROL)
+    return manifest
+
+
+def _list_objects(s3, bucket, prefix):
+    kwargs = {'Bucket': bucket, 'Prefix': prefix}
+    while True:
+        response = s3.list_objects_v2(**kwargs)
+        yield from response.get('Contents', [])
+        if not response.get('IsTruncated'):
+            return
+        kwargs['ContinuationToken'] = response['NextContinuationToken']
+
+
+def prune_snapshots(s3, bucket, prefix='catalog', keep=KEEP_MANIFESTS, grace=PRUNE_GRACE):
+    """Delete old manifest versions and pages no kept manifest refers to, returning the number deleted"""
+    cutoff = datetime.now(timezone.utc) - grace
+    manifests = sorted(_list_objects(s3, bucket, f"{prefix}/manifests/"),
+                       key=lambda obj: obj['LastModified'], reverse=True)
+    kept = [obj['Key'] for obj in manifests[:keep]]
+
+    referenced = set()
+    for key in kept + [f"{prefix}/manifest.json"]:
+        manifest = _read_manifest(s3, bucket, key)
+        if manifest:
+            for shard in manifest['shards'].values():
+                for entry in shard['pages']:
+                    referenced.update(f"{prefix}/{page_key}" for page_key in entry['keys'].values())
+
+    expired = [obj['Key'] for obj in manifests[keep:] if obj['LastModified'] < cutoff]
+    for obj in _list_objects(s3, bucket, f"{prefix}/"):
+        key = obj['Key']
+        is_page = not key.startswith(f"{prefix}/manifests/") and key != f"{prefix}/manifest.json"
+        if is_page and key not in referenced and obj['LastModified'] < cutoff:
+            expired.append(key)
+
+    # delete_objects takes at most 1000 keys per call
+    for i in range(0, len(expired), 1000):
+        s3.delete_objects(Bucket=bucket, Delete={'Objects': [{'Key': key} for key in expired[i:i + 1000]]})
+    return len(expired)
+
+
+def _publish_kwargs(app):
+    return {
+        'prefix': app.config.get('CATALOG_SNAPSHOT_PREFIX', 'catalog'),
+        'page_size': app.config.get('CATALOG_SNAPSHOT_PAGE_SIZE', 500),
+    }
+
+
+def _publish_from_config(app):
+    global _timer, _publishing, _dirty
+    with _timer_lock:
+        # A timer that fired just as it was being cancelled has been replaced, leave it to the new one
+        if threading.current_thread() is not _timer:
+            return
+        _timer = None
+        _publishing = True
+        _dirty = False
+
+    with app.app_context():
+        try:
+            s3 = get_s3_client()
+            bucket = app.config['CATALOG_SNAPSHOT_BUCKET']
+            manifest = publish_catalog(s3, bucket, **_publish_kwargs(app))
+            print(f"Catalog snapshot {manifest['version']} published ({manifest['product_count']} products)")
+            prune_snapshots(s3, bucket, _publish_kwargs(app)['prefix'])
+        except Exception as e:
+            print(f"Error publishing catalog snapshot: {e}")
+
+    with _timer_lock:
+        _publishing = False
+        rerun = _dirty
+    # Changes committed while publishing may not be in the catalog it read
+    if rerun:
+        _schedule(app)
+
+
+def _schedule(app):
+    global _timer, _pending_since, _dirty
+    debounce = app.config.get('CATALOG_SNAPSHOT_DEBOUNCE', 30)
+    now = time.monotonic()
+    with _timer_lock:
+        if _publishing:
+            _dirty = True
+            return
+        if _timer is not None:
+            # Not started yet, so it will still read this change when it fires
+            if now - _pending_since >= debounce * MAX_DEBOUNCE_PERIODS:
+                return
+            _timer.cancel()
+        else:
+            _pending_since = now
+        _timer = threading.Timer(debounce, _publish_from_config, args=(app,))
+        _timer.daemon = True
+        _timer.start()
+
+
+def schedule_publish():
+    """Publish a snapshot once changes have stopped for CATALOG_SNAPSHOT_DEBOUNCE seconds"""
+    app = current_app._get_current_object()
+    if app.config.get('CATALOG_SNAPSHOT_BUCKET'):
+        _schedule(app)
+
+
+def init_snapshots(app):
+    """Register the snapshot CLI command on the app"""
+
+    @app.cli.command('rebuild-snapshots')
+    @click.option('--dir', 'directory', help='Write to a local directory instead of S3.')
+    def rebuild_snapshots(directory):
+        """Render and publish every catalog snapshot now."""
+        bucket = app.config.get('CATALOG_SNAPSHOT_BUCKET')
+        if directory:
+            s3 = DirectoryBucket(directory)
+            bucket = bucket or 'catalog'
+        elif bucket:
+            s3 = get_s3_client()
+        else:
+            raise click.UsageError('CATALOG_SNAPSHOT_BUCKET is not set, use --dir to write locally')
+        manifest = publish_catalog(s3, bucket, force=True, brotli_quality=REBUILD_BROTLI_QUALITY,
+                                   **_publish_kwargs(app))
+        pages = sum(len(shard['pages']) for shard in manifest['shards'].values())
+        click.echo(f"Published snapshot {manifest['version']}: {manifest['product_count']} products, "
+                   f"{len(manifest['shards'])} shards, {pages} pages")
+        deleted = prune_snapshots(s3, bucket, _publish_kwargs(app)['prefix'])
+        click.echo(f"Pruned {deleted} old snapshot objects")
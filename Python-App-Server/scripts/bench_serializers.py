@@ -0,0 +1,124 @@
+"""Compare peak RSS and CPU time of the /products response paths.
+
+Each mode runs in its own process against a throwaway SQLite catalog so the
+peak RSS numbers do not bleed into each other, and the run fails unless every
+mode produced the same body.
+
+The numbers are indicative, not a production measurement: SQLite has no
+numeric type, so the legacy path converts a float to Decimal per row where
+Postgres would parse numeric, and CAST(price AS VARCHAR) on SQLite drops
+trailing zeros ("5" instead of Postgres' "5.00"). Prices are seeded with two
+significant decimals so both paths still render them identically:
+
+    python scripts/bench_serializers.py --rows 100000
+"""
+import argparse
+import hashlib
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import orjson
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+MODES = ('legacy', 'tuples', 'stream')
+
+
+def make_app(db_path):
+    from flask import Flask
+    from app import db
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{db_path}"
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    return app
+
+
+def seed(db_path, rows):
+    from app import db
+    from app.models import Product
+
+    app = make_app(db_path)
+    with app.app_context():
+        db.create_all()
+        db.session.execute(Product.__table__.insert(), [{
+            'category': 'shirts',
+            'gender': 'M' if i % 2 else 'F',
+            'productName': f"Product {i}",
+            'size': 'M',
+            'price': '19.99',
+            'thumbLink': f"https://example-bucket.s3.us-east-1.amazonaws.com/product_{i}.png",
+            'inventory': i % 50,
+            'description': 'A comfortable cotton shirt for everyday wear.'
+        } for i in range(rows)])
+        db.session.commit()
+
+
+def run_mode(db_path, mode):
+    from flask import jsonify
+    from app import serializers
+    from app.models import Product
+
+    app = make_app(db_path)
+    with app.test_request_context():
+        start = time.process_time()
+        if mode == 'legacy':
+            body = jsonify([{
+                'pid': product.pid,
+                'category': product.category,
+                'gender': product.gender,
+                'productName': product.productName,
+                'size': product.size,
+                'price': str(product.price),
+                'inventory': product.inventory,
+                'thumbLink': product.thumbLink,
+                'description': product.description
+            } for product in Product.query.all()]).get_data()
+        elif mode == 'tuples':
+            body = serializers.json_response(serializers.product_list()).get_data()
+        else:
+            body = b''.join(serializers.stream_products().response)
+        cpu = time.process_time() - start
+
+    # ru_maxrss is KiB on Linux, bytes on macOS. Read before checking the
+    # payload below, parsing it again would inflate the peak.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        peak //= 1024
+    size = len(body)
+    # jsonify sorts keys and orjson keeps field order, so compare the parsed payload
+    digest = hashlib.sha256(orjson.dumps(orjson.loads(body), option=orjson.OPT_SORT_KEYS)).hexdigest()[:12]
+    print(f"{mode:<8} cpu={cpu:.3f}s peak_rss={peak / 1024:.1f}MiB body={size / 1024 / 1024:.1f}MiB sha={digest}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--mode', choices=MODES)
+    parser.add_argument('--db')
+    args = parser.parse_args()
+
+    if args.mode:
+        run_mode(args.db, args.mode)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'catalog.db')
+        seed(db_path, args.rows)
+        print(f"{args.rows} products")
+        digests = set()
+        for mode in MODES:
+            result = subprocess.run([sys.executable, __file__, '--mode', mode, '--db', db_path],
+                                    check=True, capture_output=True, text=True)
+            print(result.stdout, end='')
+            digests.add(result.stdout.rsplit('sha=', 1)[1].strip())
+        if len(digests) != 1:
+            sys.exit("Modes produced different payloads")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+"""Publish catalog snapshots to a local S3 stand-in and verify them.
+
+Seeds a throwaway SQLite catalog, publishes through DirectoryBucket and checks
+that the manifest hashes match, every encoding decodes to the same page and
+the "all" shard round-trips to the /products payload. Also checks that
+categories whose slugs collide get separate shards named after them, that a
+republish only uploads the pages that changed, that a stale publish never
+replaces a newer manifest and that pruning keeps every page the current
+manifest refers to:
+
+    python scripts/check_snapshots.py --rows 1200 --page-size 500
+"""
+import argparse
+import gzip
+import hashlib
+import os
+import sys
+import tempfile
+from datetime import timedelta
+import brotli
+import orjson
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Slugs of the two "Tops" names collide, and the non-ASCII name has no slug at all
+CATEGORIES = ('Shirts', 'Tops/Tees', 'Tops Tees', 'Рубашки', None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1200)
+    parser.add_argument('--page-size', type=int, default=500)
+    args = parser.parse_args()
+
+    from flask import Flask
+    from app import db, serializers
+    from app.models import Product
+    from app.snapshots import ALL_SHARD, DirectoryBucket, prune_snapshots, publish_catalog
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(tmp, 'catalog.db')}"
+        app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        db.init_app(app)
+
+        with app.app_context():
+            db.create_all()
+            db.session.execute(Product.__table__.insert(), [{
+                'category': CATEGORIES[i % len(CATEGORIES)],
+                'gender': 'M' if i % 2 else 'F',
+                'productName': f"Product {i}",
+                'size': 'M',
+                'price': '19.99',
+                'inventory': i % 50,
+                'description': 'Test product'
+            } for i in range(args.rows)])
+            db.session.commit()
+
+            bucket = DirectoryBucket(os.path.join(tmp, 's3'))
+            manifest = publish_catalog(bucket, 'catalog-test', 'catalog', args.page_size)
+            again = publish_catalog(bucket, 'catalog-test', 'catalog', args.page_size)
+            assert again['version'] == manifest['version'], "version changed for an unchanged catalog"
+
+            # Manifest keys are relative to the prefix
+            def read(key):
+                return bucket.get_object(Bucket='catalog-test', Key=f"catalog/{key}")['Body'].read()
+
+            stored = orjson.loads(read('manifest.json'))
+            assert stored['version'] == manifest['version']
+            assert bucket.objects[('catalog-test', 'catalog/manifest.json')]['CacheControl'].endswith('max-age=60')
+
+            for shard, entries in stored['shards'].items():
+                for entry in entries['pages']:
+                    body = read(entry['keys']['identity'])
+                    assert hashlib.sha256(body).hexdigest() == entry['sha256'], f"hash mismatch in {shard}"
+                    assert gzip.decompress(read(entry['keys']['gzip'])) == body, f"gzip mismatch in {shard}"
+                    assert brotli.decompress(read(entry['keys']['br'])) == body, f"brotli mismatch in {shard}"
+                    assert bucket.objects[('catalog-test', f"catalog/{entry['keys']['br']}")]['ContentEncoding'] == 'br'
+
+            products = []
+            for entry in stored['shards'][ALL_SHARD]['pages']:
+                products.extend(orjson.loads(read(entry['keys']['identity'])))
+            assert products == serializers.product_list(), "all shard does not match /products"
+
+            category_total = sum(
+                len(orjson.loads(read(entry['keys']['identity'])))
+                for shard, entries in stored['shards'].items() if shard != ALL_SHARD
+                for entry in entries['pages']
+            )
+            assert category_total == args.rows, "category shards do not cover the catalog"
+            categories = [entries['category'] for shard, entries in stored['shards'].items() if shard != ALL_SHARD]
+            assert sorted(categories, key=str) == sorted(CATEGORIES, key=str), f"category shards: {categories}"
+
+            # A stock change produces a new version
+            Product.query.filter_by(pid=1).update({'inventory': 999})
+            db.session.commit()
+            put_object = bucket.put_object
+            puts = []
+            bucket.put_object = lambda **kwargs: puts.append(kwargs['Key']) or put_object(**kwargs)
+            changed = publish_catalog(bucket, 'catalog-test', 'catalog', args.page_size)
+            bucket.put_object = put_object
+            # Only page 1 of "all" and of pid 1's category changed: 2 pages x 3 encodings + 2 manifests
+            assert len(puts) == 8, f"republish uploaded {len(puts)} objects: {puts}"
+            assert changed['version'] != manifest['version'], "version did not change with inventory"
+            assert orjson.loads(read('manifest.json'))['version'] == changed['version']
+
+            # A manifest generated from a newer read of the catalog is left alone
+            newer = dict(changed, generated_at=changed['generated_at'] + 3600)
+            bucket.put_object(Bucket='catalog-test', Key='catalog/manifest.json', Body=orjson.dumps(newer))
+            Product.query.filter_by(pid=2).update({'productName': 'Renamed'})
+            db.session.commit()
+            stale = publish_catalog(bucket, 'catalog-test', 'catalog', args.page_size)
+            assert stale == newer and orjson.loads(read('manifest.json')) == newer, "stale publish replaced manifest"
+            bucket.put_object(Bucket='catalog-test', Key='catalog/manifest.json', Body=orjson.dumps(changed))
+
+            # Pruning down to one manifest drops the first version but keeps every current page
+            deleted = prune_snapshots(bucket, 'catalog-test', 'catalog', keep=1, grace=timedelta(0))
+            assert deleted > 0, "nothing was pruned"
+            for entries in changed['shards'].values():
+                for entry in entries['pages']:
+                    for key in entry['keys'].values():
+                        read(key)
+            try:
+                read(f"manifests/{manifest['version']}.json")
+                raise AssertionError("old manifest was not pruned")
+            except FileNotFoundError:
+                pass
+
+    print(f"OK: {len(stored['shards'])} shards, version {manifest['version']} -> {changed['version']}, "
+          f"{deleted} objects pruned")
+
+
+if __name__ == '__main__':
+    main()
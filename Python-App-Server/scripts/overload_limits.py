@@ -0,0 +1,170 @@
+"""Drive the rate limiter and load shedder with synthetic overload.
+
+Runs a local app whose stand-in endpoints hold a DB connection from a small,
+file-backed SQLite QueuePool while they sleep, fires concurrent readers and
+writers at it and checks the status mix of each scenario:
+
+    rate      writers over their token bucket get 429 with Retry-After, never 503
+    pool      writes are shed with 503 once the DB pool is nearly checked out,
+              while reads keep being served
+    priority  a flood of reads is shed, but checkout (writes) is not locked out
+
+    python scripts/overload_limits.py                 # every scenario
+    python scripts/overload_limits.py --scenario pool --seconds 5
+"""
+import argparse
+import collections
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+READ = 'GET /products'
+WRITE = 'POST /place-order'
+
+# Settings per scenario; anything not given keeps these defaults
+DEFAULTS = {
+    'readers': 16,
+    'writers': 16,
+    'callers': 4,            # distinct client IPs the threads are spread over
+    'hold_ms': 20,           # how long each request keeps its DB connection
+    'pool_size': 50,
+    'max_overflow': 0,
+    'rate': (1000, 1000),    # place_order token bucket (per second, burst)
+    'max_inflight': 1000,
+    'max_write_inflight': 1000,
+    'pool_utilization': 0.8,
+}
+SCENARIOS = {
+    'rate': {'rate': (0.5, 5)},
+    'pool': {'readers': 24, 'writers': 24, 'pool_size': 10, 'hold_ms': 50},
+    'priority': {'readers': 48, 'writers': 4, 'max_inflight': 16, 'max_write_inflight': 8},
+}
+
+
+def make_app(settings, db_path):
+    from flask import Flask, jsonify
+    from sqlalchemy import text
+    from sqlalchemy.pool import QueuePool
+    from app import db
+    from app.limits import init_limits
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{db_path}"
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+        'poolclass': QueuePool,
+        'pool_size': settings['pool_size'],
+        'max_overflow': settings['max_overflow'],
+        'connect_args': {'check_same_thread': False},
+    }
+    app.config['RATE_LIMITS'] = {'place_order': settings['rate']}
+    app.config['SHED_MAX_INFLIGHT'] = settings['max_inflight']
+    app.config['SHED_MAX_WRITE_INFLIGHT'] = settings['max_write_inflight']
+    app.config['SHED_POOL_UTILIZATION'] = settings['pool_utilization']
+    db.init_app(app)
+    init_limits(app)
+
+    # The session keeps its connection checked out until the request ends
+    @app.route('/products')
+    def products():
+        db.session.execute(text('select 1'))
+        time.sleep(settings['hold_ms'] / 1000)
+        return jsonify([])
+
+    @app.route('/place-order', methods=['POST'])
+    def place_order():
+        db.session.execute(text('select 1'))
+        time.sleep(settings['hold_ms'] / 1000)
+        return jsonify({"message": "ok"}), 201
+
+    return app
+
+
+def run(settings, seconds, db_path):
+    """Hammer the app for `seconds`, returning {(endpoint, status): count} and the bad Retry-After count"""
+    app = make_app(settings, db_path)
+    results = collections.Counter()
+    missing_retry_after = collections.Counter()
+    lock = threading.Lock()
+    deadline = time.monotonic() + seconds
+
+    def worker(n, is_write):
+        client = app.test_client()
+        headers = {'X-Forwarded-For': f"10.0.0.{n % settings['callers']}"}
+        while time.monotonic() < deadline:
+            if is_write:
+                response = client.post('/place-order', json={}, headers=headers)
+            else:
+                response = client.get('/products', headers=headers)
+            with lock:
+                results[(WRITE if is_write else READ, response.status_code)] += 1
+                if response.status_code in (429, 503) and not response.headers.get('Retry-After'):
+                    missing_retry_after[response.status_code] += 1
+
+    threads = [threading.Thread(target=worker, args=(n, False)) for n in range(settings['readers'])]
+    threads += [threading.Thread(target=worker, args=(n, True)) for n in range(settings['writers'])]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, missing_retry_after
+
+
+def check(name, settings, seconds, results, missing_retry_after):
+    """Return the list of expectations the scenario's results broke"""
+    failures = []
+
+    def expect(condition, message):
+        if not condition:
+            failures.append(message)
+
+    expect(not missing_retry_after, f"responses without Retry-After: {dict(missing_retry_after)}")
+    if name == 'rate':
+        rate, burst = settings['rate']
+        # Each caller gets its burst plus whatever refilled while the scenario ran
+        allowed = settings['callers'] * (burst + rate * seconds + 1)
+        expect(results[(WRITE, 429)] > 0, "no write was rate limited")
+        expect(0 < results[(WRITE, 201)] <= allowed, f"expected 1..{allowed:.0f} writes to pass the bucket")
+        expect(results[(WRITE, 503)] == 0 and results[(READ, 503)] == 0, "requests were shed")
+        expect(results[(READ, 429)] == 0, "reads were rate limited")
+    elif name == 'pool':
+        expect(results[(WRITE, 503)] > 0, "no write was shed on pool pressure")
+        expect(results[(WRITE, 201)] > 0, "no write was served")
+        expect(results[(READ, 200)] > 0, "no read was served")
+        expect(results[(WRITE, 429)] == 0, "writes were rate limited")
+    elif name == 'priority':
+        expect(results[(READ, 503)] > 0, "no read was shed")
+        expect(results[(WRITE, 503)] == 0, "writes were shed by read traffic")
+        expect(results[(WRITE, 201)] > 0, "no write was served")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scenario', choices=SCENARIOS)
+    parser.add_argument('--seconds', type=float, default=3)
+    args = parser.parse_args()
+
+    failed = False
+    for name in [args.scenario] if args.scenario else SCENARIOS:
+        settings = {**DEFAULTS, **SCENARIOS[name]}
+        with tempfile.TemporaryDirectory() as tmp:
+            results, missing_retry_after = run(settings, args.seconds, os.path.join(tmp, 'overload.db'))
+        failures = check(name, settings, args.seconds, results, missing_retry_after)
+        print(f"[{name}] {'OK' if not failures else 'FAILED'}")
+        for (endpoint, status), count in sorted(results.items()):
+            print(f"    {endpoint:<18} {status} x{count}")
+        for failure in failures:
+            print(f"    ! {failure}")
+        failed = failed or bool(failures)
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -12,9 +12,40 @@ function AuthenticatedHome({ auth: propAuth }) {
 
   useEffect(() => {
     const apiBaseUrl = process.env.REACT_APP_API_BASE_URL;
+    const catalogUrl = process.env.REACT_APP_CATALOG_URL;
     console.log("API Base URL:", apiBaseUrl);
-    fetch(`${apiBaseUrl}/products`)
-      .then((res) => res.json())
+
+    const fetchJson = (url) =>
+      fetch(url).then((res) => {
+        if (!res.ok) throw new Error(`${url} returned ${res.status}`);
+        return res.json();
+      });
+
+    // Load the catalog snapshot from CloudFront and apply live inventory from the API
+    const loadSnapshot = async () => {
+      const manifest = await fetchJson(`${catalogUrl}/manifest.json`);
+      const pages = await Promise.all(
+        manifest.shards.all.pages.map((page) => fetchJson(`${catalogUrl}/${page.keys.gzip}`))
+      );
+      const products = pages.flat();
+      try {
+        const inventory = await fetchJson(`${apiBaseUrl}/inventory`);
+        return products.map((product) => ({
+          ...product,
+          inventory: inventory[product.pid] ?? product.inventory,
+        }));
+      } catch (err) {
+        console.error("Failed to fetch live inventory, using snapshot counts:", err);
+        return products;
+      }
+    };
+
+    // Fall back to the products API if there is no snapshot or it cannot be loaded
+    (catalogUrl ? loadSnapshot() : Promise.reject(new Error("REACT_APP_CATALOG_URL not set")))
+      .catch((err) => {
+        if (catalogUrl) console.error("Failed to load catalog snapshot:", err);
+        return fetchJson(`${apiBaseUrl}/products`);
+      })
       .then((data) => {
         setAllProducts(data);
         localStorage.setItem("allProducts", JSON.stringify(data));  // <--- save here